@@ -3,7 +3,7 @@
 bl_info = {
     "name": "Blender AI Agent",
     "author": "Your Name",
-    "version": (0, 4, 1),
+    "version": (0, 5, 0),
     "blender": (4, 2, 0),
     "location": "View3D > Sidebar > AI Agent",
     "description": "AI Assistant for Geometry Nodes",
@@ -12,13 +12,53 @@ bl_info = {
 
 import bpy
 import requests
-import json
 import threading
 from . import socket_listener
 from . import tools
+from ._json import dumps as _dumps, loads as _loads
 
 # --- Constants ---
 AGENT_API_URL = "http://127.0.0.1:8000/chat"
+_MAX_HISTORY = 200  # Oldest chat messages beyond this are dropped
+
+# Role -> (row alignment, header text, icon) for the chat panel
+_ROLE_META = {
+    "user": ('RIGHT', "You", 'USER'),
+    "ai": ('LEFT', "Agent", 'SHADERFX'),
+}
+
+# --- Global State ---
+# Shared HTTP session so chat turns reuse one keep-alive connection to the agent
+_session = None
+
+# Pre-split message lines, keyed by (RNA pointer, content hash) so draw() skips str.split
+_MAX_MESSAGE_LINES = 40
+_line_cache = {}
+
+def _get_message_lines(msg):
+    """Return (lines, truncated) for a ChatMessage, computing them once per content."""
+    content = msg.content
+    key = (msg.as_pointer(), hash(content))
+    cached = _line_cache.get(key)
+    if cached is None:
+        lines = [line for line in content.split('\n') if line.strip()]
+        cached = (lines[:_MAX_MESSAGE_LINES], len(lines) > _MAX_MESSAGE_LINES)
+        _line_cache[key] = cached
+    return cached
+
+def _prune_line_cache(chat_history):
+    """Drop cached lines for messages that no longer exist in the collection."""
+    live = {m.as_pointer() for m in chat_history}
+    for key in [k for k in _line_cache if k[0] not in live]:
+        del _line_cache[key]
+
+# (window, area, region) pointers of the last drawn AI Agent panel
+_panel_region_key = None
+
+def _trim_history(chat_history):
+    """Keep chat_history to the last _MAX_HISTORY messages."""
+    while len(chat_history) > _MAX_HISTORY:
+        chat_history.remove(0)
 
 # --- Properties ---
 
@@ -38,7 +78,29 @@ class AgentProperties(bpy.types.PropertyGroup):
 
 # --- GLOBAL HANDLERS (Crash Proof) ---
 
-def handle_success(data):
+def _tag_panel_redraw():
+    """Redraw the AI Agent sidebar region, falling back to every VIEW_3D area."""
+    windows = bpy.context.window_manager.windows
+    if _panel_region_key is not None:
+        win_ptr, area_ptr, region_ptr = _panel_region_key
+        for win in windows:
+            if win.as_pointer() != win_ptr:
+                continue
+            for area in win.screen.areas:
+                if area.as_pointer() != area_ptr:
+                    continue
+                for region in area.regions:
+                    if region.as_pointer() == region_ptr:
+                        region.tag_redraw()
+                        return
+
+    for win in windows:
+        for area in win.screen.areas:
+            if area.type == 'VIEW_3D':
+                area.tag_redraw()
+
+def _push_response(content, status_message):
+    """Shared tail of the success/error handlers: append the AI message and redraw."""
     try:
         scene = bpy.context.scene
         if not scene: 
@@ -47,45 +109,29 @@ def handle_success(data):
 
         props = scene.agent_props
         props.is_processing = False
-        props.status_message = ""
+        props.status_message = status_message
         
         # Add Response
         msg = props.chat_history.add()
         msg.role = "ai"
-        msg.content = data.get("text", "")
-        
-        if data.get("code"):
-            msg.content += "\n\n[CODE EXECUTED]"
+        msg.content = content
+        _trim_history(props.chat_history)
+
+        _prune_line_cache(props.chat_history)
             
         # Force Redraw
-        for win in bpy.context.window_manager.windows:
-            for area in win.screen.areas:
-                if area.type == 'VIEW_3D':
-                    area.tag_redraw()
+        _tag_panel_redraw()
     except Exception as e:
-        print(f"[Blender-MCP] Error in success handler: {e}")
+        print(f"[Blender-MCP] Error in response handler: {e}")
 
-def handle_error(error_msg):
-    try:
-        scene = bpy.context.scene
-        if not scene:
-             if bpy.data.scenes: scene = bpy.data.scenes[0]
-             else: return
+def handle_success(data):
+    content = data.get("text", "")
+    if data.get("code"):
+        content += "\n\n[CODE EXECUTED]"
+    _push_response(content, "")
 
-        props = scene.agent_props
-        props.is_processing = False
-        props.status_message = "Error!"
-        
-        msg = props.chat_history.add()
-        msg.role = "ai"
-        msg.content = f"Error: {error_msg}"
-        
-        for win in bpy.context.window_manager.windows:
-            for area in win.screen.areas:
-                if area.type == 'VIEW_3D':
-                    area.tag_redraw()
-    except Exception as e:
-         print(f"[Blender-MCP] Error in error handler: {e}")
+def handle_error(error_msg):
+    _push_response(f"Error: {error_msg}", "Error!")
 
 # --- Operators ---
 
@@ -106,6 +152,7 @@ class MCP_OT_SendChat(bpy.types.Operator):
         msg = props.chat_history.add()
         msg.role = "user"
         msg.content = user_text
+        _trim_history(props.chat_history)
         
         # Update UI
         props.chat_input = ""
@@ -113,21 +160,26 @@ class MCP_OT_SendChat(bpy.types.Operator):
         props.status_message = "Thinking..."
         context.area.tag_redraw()
         
-        history_payload = [{"role": m.role, "text": m.content} for m in props.chat_history[-10:]]
-        
+        # The service plans from the live scene, not the chat log, so only the prompt is sent
         def send_request():
             try:
-                payload = {"prompt": user_text, "history": history_payload}
-                response = requests.post(AGENT_API_URL, json=payload, timeout=120)
+                payload = {"prompt": user_text}
+                response = _session.post(
+                    AGENT_API_URL,
+                    data=_dumps(payload),
+                    headers={"Content-Type": "application/json"},
+                    timeout=120,
+                )
                 
                 if response.status_code == 200:
-                    data = response.json()
-                    bpy.app.timers.register(lambda: handle_success(data))
+                    data = _loads(response.content)
+                    socket_listener.call_on_main_thread(lambda: handle_success(data))
                 else:
                     err = f"HTTP {response.status_code}: {response.reason}"
-                    bpy.app.timers.register(lambda: handle_error(err))
+                    socket_listener.call_on_main_thread(lambda: handle_error(err))
             except Exception as e:
-                bpy.app.timers.register(lambda: handle_error(str(e)))
+                err = str(e)
+                socket_listener.call_on_main_thread(lambda: handle_error(err))
 
         threading.Thread(target=send_request, daemon=True).start()
         return {'FINISHED'}
@@ -138,6 +190,7 @@ class MCP_OT_ClearChat(bpy.types.Operator):
     bl_label = "Clear"
     def execute(self, context):
         context.scene.agent_props.chat_history.clear()
+        _line_cache.clear()
         return {'FINISHED'}
 
 class MCP_OT_StartServer(bpy.types.Operator):
@@ -164,6 +217,14 @@ class MCP_PT_MainPanel(bpy.types.Panel):
     bl_category = "AI Agent"
 
     def draw(self, context):
+        global _panel_region_key
+        if context.region is not None:
+            _panel_region_key = (
+                context.window.as_pointer(),
+                context.area.as_pointer(),
+                context.region.as_pointer(),
+            )
+
         layout = self.layout
         props = context.scene.agent_props
         
@@ -182,29 +243,29 @@ class MCP_PT_MainPanel(bpy.types.Panel):
 
         # 2. Chat History (Scrollable-ish Box)
         chat_box = layout.box()
-        if not props.chat_history:
+        chat_history = props.chat_history
+        n = len(chat_history)
+        if n == 0:
             chat_box.label(text="Ready to help.", icon='INFO')
         
         # Show last 5 messages
-        start = max(0, len(props.chat_history) - 5)
-        for i in range(start, len(props.chat_history)):
-            msg = props.chat_history[i]
+        for i in range(max(0, n - 5), n):
+            msg = chat_history[i]
             col = chat_box.column(align=True)
             
             # Role Header
             row = col.row()
-            if msg.role == "user":
-                row.alignment = 'RIGHT'
-                row.label(text="You", icon='USER')
-            else:
-                row.alignment = 'LEFT'
-                row.label(text="Agent", icon='SHADERFX')
+            align, label, icon = _ROLE_META.get(msg.role, _ROLE_META["ai"])
+            row.alignment = align
+            row.label(text=label, icon=icon)
             
-            # Message Text (Split lines)
+            # Message Text (Split lines, cached)
             sub = col.column()
-            for line in msg.content.split('\n'):
-                if line.strip():
-                    sub.label(text=line)
+            lines, truncated = _get_message_lines(msg)
+            for line in lines:
+                sub.label(text=line)
+            if truncated:
+                sub.label(text="... (truncated)")
             col.separator()
 
         # 3. Status
@@ -239,10 +300,15 @@ classes = (
 )
 
 def register():
+    global _session
+    _session = requests.Session()
+    _session.mount("http://", requests.adapters.HTTPAdapter(pool_connections=2, pool_maxsize=4))
+
     for cls in classes:
         bpy.utils.register_class(cls)
     
     bpy.types.Scene.agent_props = bpy.props.PointerProperty(type=AgentProperties)
+    socket_listener.start_queue_processor()
     print("[Blender-MCP] Addon Registered")
 
 def unregister():
@@ -252,6 +318,13 @@ def unregister():
         
     if socket_listener.running:
         socket_listener.stop()
+    socket_listener.stop_queue_processor()
+    tools.clear_caches()
+
+    global _session
+    if _session is not None:
+        _session.close()
+        _session = None
 
 if __name__ == "__main__":
     register()
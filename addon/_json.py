@@ -0,0 +1,14 @@
+# addon/_json.py
+# Shared JSON codec for the addon: orjson (C-backed, emits bytes) when it's
+# installed in Blender's Python, else the stdlib with the same bytes-out interface.
+
+import json
+
+try:
+    import orjson
+    dumps = orjson.dumps
+    loads = orjson.loads
+except ImportError:
+    def dumps(obj):
+        return json.dumps(obj).encode('utf-8')
+    loads = json.loads
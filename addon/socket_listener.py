@@ -2,25 +2,117 @@
 import bpy
 import socket
 import threading
-import json
 import queue
 import traceback
 import struct
+import selectors
+from concurrent.futures import ThreadPoolExecutor
 from . import tools  # Access the tools.py registry
+from ._json import dumps as _dumps, loads as _loads
 
 # --- Configuration ---
 HOST = '127.0.0.1'
 PORT = 8081
+MAX_MESSAGE_SIZE = 16 << 20     # 16 MiB cap on a request body
+RECV_BUFFER_SIZE = 1 << 18      # 256 KiB socket receive buffer
+QUEUE_POLL_INTERVAL = 0.02      # Seconds between main-thread queue drains (~1 frame)
+# Clients keep their connection open, so this bounds concurrent clients. Each
+# agent-service worker holds two (its MCP subprocess plus its in-process
+# connection), so 8 fits 4 workers; the service caps WEB_CONCURRENCY against
+# BLENDER_MAX_CLIENTS, which must match this value.
+MAX_CLIENTS = 8
 
 # --- Global State ---
 server_thread = None
 running = False
-task_queue = queue.Queue()
+_timer_active = False   # Whether queue_processor is registered with bpy.app.timers
+task_queue = queue.Queue()          # Socket tool calls awaiting the main thread
+main_thread_queue = queue.Queue()   # Other callbacks (e.g. chat replies) for the main thread
+client_pool = None      # ThreadPoolExecutor servicing accepted connections
+_shutdown_r = None      # Wake-up socket pair: stop() writes to _shutdown_w
+_shutdown_w = None      # so the selector in server_loop returns immediately
+_clients = set()        # Open client connections, shut down by stop()
+_clients_lock = threading.Lock()
+
+def _send_framed(conn, payload):
+    """
+    Send a 4-byte Big-Endian length prefix plus payload in a single syscall
+    where the platform supports sendmsg (not available on Windows).
+    """
+    header = struct.pack('>I', len(payload))
+    if not hasattr(conn, "sendmsg"):
+        conn.sendall(header + payload)
+        return
+
+    sent = conn.sendmsg([header, payload])
+    # sendmsg may write partially; finish the remainder with sendall
+    if sent < len(header):
+        conn.sendall(header[sent:])
+        conn.sendall(payload)
+    elif sent < len(header) + len(payload):
+        conn.sendall(memoryview(payload)[sent - len(header):])
+
+def _recv_exact(conn, view):
+    """
+    Fill the memoryview completely from conn.
+    Returns False if the peer closed cleanly before sending anything.
+    """
+    total = len(view)
+    bytes_recd = 0
+    while bytes_recd < total:
+        n = conn.recv_into(view[bytes_recd:], total - bytes_recd)
+        if not n:
+            if bytes_recd == 0:
+                return False
+            raise RuntimeError("Socket connection broken")
+        bytes_recd += n
+    return True
+
+def _run_request(request):
+    """
+    We cannot run bpy tools here (background thread).
+    We must pass it to the Main Thread via task_queue and wait for the result.
+    """
+    # Single-slot handoff: the main thread puts exactly one result
+    result_q = queue.Queue(maxsize=1)
+
+    def task_runner():
+        res = {"ok": False, "error": "No result returned."}
+        registry = tools.TOOL_REGISTRY
+        try:
+            tool_name = request.get("tool")
+            params = request.get("params", {})
+
+            # Route to tools.py (single lookup)
+            func = registry.get(tool_name)
+            if func is not None:
+                # Execute
+                res = func(**params)
+            elif tool_name == "list_tools":
+                res = tools.get_tool_spec()
+            else:
+                res = {"ok": False, "error": f"Unknown tool: {tool_name}"}
+        except Exception as e:
+            traceback.print_exc()
+            res = {"ok": False, "error": f"Internal Error: {str(e)}"}
+        finally:
+            # Hand the result back to the waiting background thread
+            result_q.put_nowait(res)
+
+    # Put the task on the queue
+    task_queue.put(task_runner)
+    
+    # Wait for Main Thread to finish (Timeout 30s)
+    try:
+        return result_q.get(timeout=30.0)
+    except queue.Empty:
+        return {"ok": False, "error": "Timeout: Blender Main Thread is busy."}
 
 def handle_client_connection(conn, addr):
     """
-    Handles the socket communication for a single request.
-    Protocol: 
+    Handles the socket communication for one client connection.
+    The connection stays open and serves requests until the client closes it.
+    Protocol (per request): 
       1. Receive 4-byte Big-Endian Integer (Message Length)
       2. Receive N bytes (JSON Body)
       3. Process
@@ -29,143 +121,199 @@ def handle_client_connection(conn, addr):
     """
     print(f"[Blender-MCP] Connected by {addr}")
     try:
-        # --- 1. Read Message Length ---
-        raw_len = conn.recv(4)
-        if not raw_len: 
-            return
-        msg_len = struct.unpack('>I', raw_len)[0]
-
-        # --- 2. Read Message Body ---
-        # Loop until we have all bytes
-        chunks = []
-        bytes_recd = 0
-        while bytes_recd < msg_len:
-            chunk = conn.recv(min(msg_len - bytes_recd, 4096))
-            if not chunk:
+        # Don't let Nagle hold back the small length prefix
+        conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        header = bytearray(4)
+        while running:
+            # --- 1. Read Message Length ---
+            if not _recv_exact(conn, memoryview(header)):
+                return # Client closed the connection
+            msg_len = struct.unpack('>I', header)[0]
+            if msg_len == 0 or msg_len > MAX_MESSAGE_SIZE:
+                # Reject before allocating; reply with an empty frame
+                print(f"[Blender-MCP] Rejected message of {msg_len} bytes from {addr}")
+                conn.sendall(struct.pack('>I', 0))
+                return
+
+            # --- 2. Read Message Body ---
+            # Fill one preallocated buffer in place
+            buf = bytearray(msg_len)
+            if not _recv_exact(conn, memoryview(buf)):
                 raise RuntimeError("Socket connection broken")
-            chunks.append(chunk)
-            bytes_recd += len(chunk)
-        
-        message_str = b''.join(chunks).decode('utf-8')
-        request = json.loads(message_str)
+            request = _loads(buf) # both parsers accept UTF-8 bytes directly
 
-        # --- 3. Process Request (Thread-Safe) ---
-        # We cannot run bpy tools here (background thread).
-        # We must pass it to the Main Thread via task_queue.
-        
-        result_container = {}
-        event = threading.Event()
-
-        def task_runner():
-            try:
-                tool_name = request.get("tool")
-                params = request.get("params", {})
-
-                # Route to tools.py
-                if tool_name in tools.TOOL_REGISTRY:
-                    func = tools.TOOL_REGISTRY[tool_name]
-                    # Execute
-                    res = func(**params)
-                    result_container['data'] = res
-                elif tool_name == "list_tools":
-                    result_container['data'] = tools.get_tool_spec()
-                else:
-                    result_container['data'] = {"ok": False, "error": f"Unknown tool: {tool_name}"}
-            except Exception as e:
-                traceback.print_exc()
-                result_container['data'] = {"ok": False, "error": f"Internal Error: {str(e)}"}
-            finally:
-                # Signal the background thread that we are done
-                event.set()
-
-        # Put the task on the queue
-        task_queue.put(task_runner)
-        
-        # Wait for Main Thread to finish (Timeout 30s)
-        completed = event.wait(timeout=30.0)
-        
-        if not completed:
-            response = {"ok": False, "error": "Timeout: Blender Main Thread is busy."}
-        else:
-            response = result_container.get('data', {"ok": False, "error": "No result returned."})
+            # --- 3. Process Request (Thread-Safe) ---
+            response = _run_request(request)
 
-        # --- 4. Send Response ---
-        response_bytes = json.dumps(response).encode('utf-8')
-        # Prefix with 4-byte length
-        conn.sendall(struct.pack('>I', len(response_bytes)))
-        conn.sendall(response_bytes)
+            # --- 4. Send Response ---
+            response_bytes = _dumps(response)
+            # Prefix with 4-byte length, sent together with the body
+            _send_framed(conn, response_bytes)
 
     except Exception as e:
-        print(f"[Blender-MCP] Error handling client: {e}")
-        traceback.print_exc()
+        if running:
+            print(f"[Blender-MCP] Error handling client: {e}")
+            traceback.print_exc()
+    finally:
+        with _clients_lock:
+            _clients.discard(conn)
+        conn.close()
+
+def _reject_client(conn, addr):
+    """
+    Answer an over-limit client's first request with an error frame and close,
+    so it fails fast instead of waiting in the pool queue. The request is read
+    first (briefly) so closing doesn't reset the connection before the reply lands.
+    """
+    print(f"[Blender-MCP] Refused {addr}: {MAX_CLIENTS} clients already connected")
+    try:
+        conn.settimeout(1.0)
+        header = bytearray(4)
+        if _recv_exact(conn, memoryview(header)):
+            msg_len = struct.unpack('>I', header)[0]
+            if 0 < msg_len <= MAX_MESSAGE_SIZE:
+                _recv_exact(conn, memoryview(bytearray(msg_len)))
+        error = f"Blender server busy: {MAX_CLIENTS} clients already connected."
+        _send_framed(conn, _dumps({"ok": False, "error": error}))
+    except Exception:
+        pass # Client went away or never sent; nothing more to do
     finally:
         conn.close()
 
 def server_loop():
     """
-    The infinite loop running in a background thread.
-    Accepts new connections.
+    The accept loop running in a background thread.
+    Blocks on a selector until a client connects or stop() signals shutdown,
+    then hands each connection to the client pool.
     """
     global running
+    sel = selectors.DefaultSelector()
     with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
         s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        # Set on the listener so accepted connections inherit them before the
+        # TCP window is negotiated: keepalive for stale clients, and a receive
+        # buffer large enough for a typical tool payload in one recv_into.
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RECV_BUFFER_SIZE)
         try:
             s.bind((HOST, PORT))
             s.listen()
-            s.settimeout(1.0) # Timeout to allow checking 'running' flag
+            sel.register(s, selectors.EVENT_READ)
+            sel.register(_shutdown_r, selectors.EVENT_READ)
             print(f"[Blender-MCP] Listening on {HOST}:{PORT}")
             
             while running:
-                try:
-                    conn, addr = s.accept()
-                    # Handle one request at a time (blocking) or spawn thread
-                    # For simplicity/safety with Blender state, we handle sequentially here,
-                    # but the 'handle_client' waits for the main thread anyway.
-                    handle_client_connection(conn, addr)
-                except socket.timeout:
-                    continue # Check running flag again
-                except Exception as e:
-                    print(f"[Blender-MCP] Accept Error: {e}")
+                for key, _ in sel.select():
+                    if key.fileobj is _shutdown_r:
+                        break # stop() woke us up; re-check running flag
+                    try:
+                        conn, addr = s.accept()
+                        # Each client holds a pool thread for its whole connection,
+                        # so refuse rather than queue once every thread is taken
+                        with _clients_lock:
+                            full = len(_clients) >= MAX_CLIENTS
+                            if not full:
+                                _clients.add(conn)
+                        if full:
+                            # Off the accept thread: the brief read must not stall accepts or stop()
+                            threading.Thread(target=_reject_client, args=(conn, addr), daemon=True).start()
+                            continue
+                        # Connections are serviced concurrently; the bpy work itself
+                        # is still serialized through task_queue on the main thread.
+                        client_pool.submit(handle_client_connection, conn, addr)
+                    except Exception as e:
+                        print(f"[Blender-MCP] Accept Error: {e}")
                     
         except OSError as e:
             print(f"[Blender-MCP] Bind failed: {e}")
+        finally:
+            sel.close()
+
+def call_on_main_thread(func):
+    """Schedule func() to run on Blender's Main Thread at the next queue_processor tick."""
+    main_thread_queue.put(func)
 
 def queue_processor():
     """
-    Runs on the Main Thread every 0.1 seconds.
-    Executes tasks waiting in the queue.
+    Runs on the Main Thread roughly once per frame.
+    Drains every task waiting in both queues.
     """
-    while not task_queue.empty():
+    while True:
         try:
             task = task_queue.get_nowait()
-            task() # Run the function (accesses bpy)
         except queue.Empty:
             break
-    return 0.1 # Schedule next run
+        task() # Run the function (accesses bpy)
+
+    while True:
+        try:
+            callback = main_thread_queue.get_nowait()
+        except queue.Empty:
+            break
+        try:
+            callback()
+        except Exception:
+            traceback.print_exc()
+    return QUEUE_POLL_INTERVAL # Schedule next run
+
+def start_queue_processor():
+    """Called by __init__.py on register; the timer lives as long as the addon."""
+    global _timer_active
+    if not _timer_active:
+        # persistent: keep draining across File > Open
+        bpy.app.timers.register(queue_processor, persistent=True)
+        _timer_active = True
+
+def stop_queue_processor():
+    """Called by __init__.py on unregister"""
+    global _timer_active
+    if _timer_active:
+        bpy.app.timers.unregister(queue_processor)
+        _timer_active = False
 
 def start():
     """Called by __init__.py to start the server"""
-    global running, server_thread
+    global running, server_thread, client_pool, _shutdown_r, _shutdown_w
     if running:
         return
     
     running = True
+    # socketpair rather than os.pipe so the selector also works on Windows
+    _shutdown_r, _shutdown_w = socket.socketpair()
+    client_pool = ThreadPoolExecutor(max_workers=MAX_CLIENTS, thread_name_prefix="Blender-MCP")
     server_thread = threading.Thread(target=server_loop, daemon=True)
     server_thread.start()
     
-    if not bpy.app.timers.is_registered(queue_processor):
-        bpy.app.timers.register(queue_processor)
-    
     print("[Blender-MCP] Server Started")
 
 def stop():
     """Called by __init__.py to stop the server"""
-    global running
+    global running, client_pool, _shutdown_r, _shutdown_w
     running = False
+    if _shutdown_w is not None:
+        try:
+            _shutdown_w.send(b'\0')
+        except OSError:
+            pass
     if server_thread:
         server_thread.join(timeout=2.0)
-    
-    if bpy.app.timers.is_registered(queue_processor):
-        bpy.app.timers.unregister(queue_processor)
+
+    # Unblock pool threads waiting on persistent client connections
+    with _clients_lock:
+        clients = list(_clients)
+    for conn in clients:
+        try:
+            conn.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    if client_pool is not None:
+        client_pool.shutdown(wait=False)
+        client_pool = None
+    for sock in (_shutdown_r, _shutdown_w):
+        if sock is not None:
+            sock.close()
+    _shutdown_r = _shutdown_w = None
         
     print("[Blender-MCP] Server Stopped")
@@ -4,10 +4,15 @@
 
 from __future__ import annotations
 
+import ast
 import bpy
 import fnmatch
+import functools
 import json
-from typing import Any, Dict, List, Optional, Tuple, Union
+import math
+import random
+from types import CodeType
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
 # ------------------------------
 # Response helpers (uniform envelope)
@@ -23,49 +28,92 @@ def _err(msg: str) -> Dict[str, Any]:
 # Serialization helpers
 # ------------------------------
 
+def _identity(v: Any) -> Any:
+    return v
+
+def _conv_seq(v: Any) -> List[Any]:
+    return [_to_json_value(x) for x in v]
+
+def _conv_dict(v: Any) -> Dict[Any, Any]:
+    return {k: _to_json_value(x) for k, x in v.items()}
+
+def _conv_to_list(v: Any) -> Any:
+    try:
+        return v.to_list()
+    except Exception:
+        return str(v)
+
+def _conv_to_tuple(v: Any) -> Any:
+    try:
+        return tuple(v.to_tuple())
+    except Exception:
+        return str(v)
+
+def _conv_id(v: Any) -> Any:
+    return v.name
+
+# Exact type -> converter. Seeded with built-ins; other classes are resolved
+# once by _resolve_json_converter and added here.
+_JSON_DISPATCH: Dict[type, Callable[[Any], Any]] = {
+    str: _identity,
+    int: _identity,
+    float: _identity,
+    bool: _identity,
+    type(None): _identity,
+    list: _conv_seq,
+    tuple: _conv_seq,
+    dict: _conv_dict,
+}
+
+def _resolve_json_converter(cls: type) -> Callable[[Any], Any]:
+    """
+    Pick a converter for a class not yet in _JSON_DISPATCH, in the same
+    priority order as _to_json_value documents, and remember it.
+    """
+    # mathutils types often expose to_tuple or to_list
+    if hasattr(cls, "to_list"):
+        fn = _conv_to_list
+    elif hasattr(cls, "to_tuple"):
+        fn = _conv_to_tuple
+    # Blender ID datablocks: prefer names for compactness
+    elif issubclass(cls, bpy.types.ID):
+        fn = _conv_id
+    elif issubclass(cls, (str, int, float, bool)):
+        fn = _identity
+    elif issubclass(cls, (list, tuple)):
+        fn = _conv_seq
+    elif issubclass(cls, dict):
+        fn = _conv_dict
+    # Fallback to string representation
+    else:
+        fn = str
+    _JSON_DISPATCH[cls] = fn
+    return fn
+
 def _to_json_value(v: Any) -> Any:
     """
     Convert Blender/mathutils types to JSON-serializable primitives.
     - Vectors/Colors/Quaternions -> list/tuple
     - IDs -> name
     - Fallback: return as-is if already primitive
+    Dispatches on type(v); the converter for each class is resolved once.
     """
-    try:
-        # mathutils types often expose to_tuple or to_list
-        if hasattr(v, "to_list"):
-            return v.to_list()
-        if hasattr(v, "to_tuple"):
-            return tuple(v.to_tuple())
-    except Exception:
-        pass
-
-    # Blender ID datablocks: prefer names for compactness
-    if isinstance(v, bpy.types.ID):
-        return v.name
+    fn = _JSON_DISPATCH.get(type(v))
+    if fn is None:
+        fn = _resolve_json_converter(type(v))
+    return fn(v)
 
-    # Built-ins are fine
-    if isinstance(v, (str, int, float, bool)) or v is None:
-        return v
-
-    # Lists / tuples: convert elements
-    if isinstance(v, (list, tuple)):
-        return [_to_json_value(x) for x in v]
-
-    # Dict: convert values
-    if isinstance(v, dict):
-        return {k: _to_json_value(x) for k, x in v.items()}
-
-    # Fallback to string representation
-    return str(v)
+_MISSING = object()  # Sentinel for absent attributes
 
 def _safe_get_default(socket: bpy.types.NodeSocket) -> Any:
     """
     Safely read default_value for unlinked sockets when available.
     """
-    if not hasattr(socket, "default_value"):
-        return None
     try:
-        raw = socket.default_value
+        # One attribute lookup instead of hasattr + read
+        raw = getattr(socket, "default_value", _MISSING)
+        if raw is _MISSING:
+            return None
         return _to_json_value(raw)
     except Exception:
         return None
@@ -74,6 +122,35 @@ def _safe_get_default(socket: bpy.types.NodeSocket) -> Any:
 # 1) Introspection tools (no images)
 # ------------------------------
 
+@functools.lru_cache(maxsize=1)
+def _geo_node_index() -> Dict[str, Tuple[str, str, Any, str]]:
+    """
+    One-time scan of bpy.types for Geometry Node classes.
+    Maps id -> (id_lower, label_lower, label, description).
+    """
+    index: Dict[str, Tuple[str, str, Any, str]] = {}
+    for name in dir(bpy.types):
+        if "GeometryNode" in name:
+            cls = getattr(bpy.types, name)
+            label = getattr(cls, "bl_label", name)
+            index[name] = (name.lower(), str(label).lower(), label, getattr(cls, "bl_description", ""))
+    return index
+
+@functools.lru_cache(maxsize=256)
+def _search_cached(q: str) -> Tuple[Dict[str, Any], ...]:
+    matches: List[Dict[str, Any]] = []
+    for name, (name_lower, label_lower, label, desc) in _geo_node_index().items():
+        if q in name_lower or q in label_lower:
+            matches.append({
+                "id": name,
+                "label": label,
+                "description": desc
+            })
+            # Limit to 5 to keep context compact
+            if len(matches) >= 5:
+                break
+    return tuple(matches)
+
 def search_node_types(query: str) -> Dict[str, Any]:
     """
     Search Geometry Node classes by ID or label.
@@ -82,85 +159,90 @@ def search_node_types(query: str) -> Dict[str, Any]:
     """
     if not isinstance(query, str) or not query.strip():
         return _err("Query must be a non-empty string.")
-    q = query.lower()
-    matches: List[Dict[str, Any]] = []
+    return _ok(list(_search_cached(query.lower())))
 
-    for name in dir(bpy.types):
-        if "GeometryNode" in name:
-            cls = getattr(bpy.types, name)
-            label = getattr(cls, "bl_label", name)
-            desc = getattr(cls, "bl_description", "")
-            if q in name.lower() or q in str(label).lower():
-                matches.append({
-                    "id": name,
-                    "label": label,
-                    "description": desc
-                })
-    # Limit to 5 to keep context compact
-    return _ok(matches[:5])
+# Generic bpy.types.Node RNA properties that say nothing about a specific node type
+_IGNORED_NODE_PROPS = frozenset({
+    'rna_type', 'name', 'label', 'location', 'width', 'height',
+    'parent', 'use_custom_color', 'color', 'select', 'show_options',
+    'mute', 'hide', 'inputs', 'outputs', 'dimensions', 'internal_links'
+})
 
-def get_node_details(node_internal_id: str) -> Dict[str, Any]:
+# Leading dot hides the tree from node-group pickers
+_INSPECTOR_TREE_NAME = ".MCP_Inspector_Temp"
+_LEGACY_INSPECTOR_TREE_NAMES = ("MCP_Inspector_Temp",)
+
+def _inspector_tree() -> bpy.types.GeometryNodeTree:
     """
-    Inspect a specific Geometry Node by internal ID, returning:
-    - id, label, description
-    - inputs: [{name, identifier, type, default}]
-    - outputs: [{name, identifier, type}]
-    - parameters: non-socket RNA properties (ENUM options included)
-    Uses a temporary GeometryNodeTree to safely spawn and introspect the node.
+    Get (or lazily create) the scratch tree used by get_node_details.
+    Looked up by name rather than held as a reference, since ID pointers
+    don't survive file loads. With zero users and no fake user it is not
+    saved to the .blend; clear_caches() removes it on unregister.
     """
-    if not isinstance(node_internal_id, str) or not node_internal_id.strip():
-        return _err("node_internal_id must be a non-empty string.")
-
-    temp_tree_name = "MCP_Inspector_Temp"
-    if temp_tree_name in bpy.data.node_groups:
-        try:
-            bpy.data.node_groups.remove(bpy.data.node_groups[temp_tree_name])
-        except Exception:
-            pass
+    tree = bpy.data.node_groups.get(_INSPECTOR_TREE_NAME)
+    if tree is None or tree.bl_idname != 'GeometryNodeTree':
+        tree = bpy.data.node_groups.new(_INSPECTOR_TREE_NAME, 'GeometryNodeTree')
+        tree.use_fake_user = False
+    return tree
+
+def _remove_inspector_tree() -> None:
+    """Delete the scratch tree (and any left by older versions of the addon)."""
+    for name in (_INSPECTOR_TREE_NAME,) + _LEGACY_INSPECTOR_TREE_NAMES:
+        tree = bpy.data.node_groups.get(name)
+        if tree is not None:
+            try:
+                bpy.data.node_groups.remove(tree)
+            except Exception:
+                pass
 
-    temp_tree = bpy.data.node_groups.new(temp_tree_name, 'GeometryNodeTree')
-    result: Dict[str, Any] = {}
+@functools.lru_cache(maxsize=512)
+def _introspect_node(node_internal_id: str) -> Dict[str, Any]:
+    """
+    Spawn the node in the inspector tree and describe its sockets and parameters.
+    Node schemas are fixed per class, so results are memoized per id; failures
+    raise and are therefore never cached. Callers must treat the dict as read-only.
+    """
+    temp_tree = _inspector_tree()
+    node = temp_tree.nodes.new(node_internal_id)
     try:
-        node = temp_tree.nodes.new(node_internal_id)
         node_cls = getattr(bpy.types, node_internal_id, None)
         description = getattr(node_cls, "bl_description", "No description available.")
 
-        result = {
+        result: Dict[str, Any] = {
             "id": node_internal_id,
             "label": node.label if node.label else node.name,
             "description": description,
             "inputs": [],
             "outputs": [],
-            # "parameters": []
+            "parameters": []
         }
 
         # Inputs
-        for sock in node.inputs:
-            result["inputs"].append({
+        safe_default = _safe_get_default
+        result["inputs"] = [
+            {
                 "name": sock.name,
                 "identifier": sock.identifier,
                 "type": sock.bl_idname,
-                "default": _safe_get_default(sock)
-            })
+                "default": safe_default(sock)
+            }
+            for sock in node.inputs
+        ]
 
         # Outputs
-        for sock in node.outputs:
-            result["outputs"].append({
+        result["outputs"] = [
+            {
                 "name": sock.name,
                 "identifier": sock.identifier,
                 "type": sock.bl_idname
-            })
+            }
+            for sock in node.outputs
+        ]
 
         # Non-socket RNA properties
-        ignored = {
-            'rna_type', 'name', 'label', 'location', 'width', 'height',
-            'parent', 'use_custom_color', 'color', 'select', 'show_options',
-            'mute', 'hide', 'inputs', 'outputs', 'dimensions', 'internal_links'
-        }
-        for prop_id in node.bl_rna.properties.keys():
-            if prop_id in ignored:
+        for prop_id, prop in node.bl_rna.properties.items():
+            if prop_id in _IGNORED_NODE_PROPS:
                 continue
-            prop = node.bl_rna.properties[prop_id]
             entry = {
                 "name": prop.name,
                 "identifier": prop.identifier,
@@ -169,24 +251,40 @@ def get_node_details(node_internal_id: str) -> Dict[str, Any]:
             }
             if prop.type == 'ENUM':
                 try:
-                    entry["options"] = [item.identifier for item in prop.enum_items]
+                    # Walk the RNA enum collection once for both outputs
+                    items = [(item.identifier, getattr(item, "description", "")) for item in prop.enum_items]
+                    entry["options"] = [ident for ident, _ in items]
                     # Human-friendly docs if available
-                    entry["option_docs"] = {
-                        item.identifier: getattr(item, "description", "") for item in prop.enum_items
-                    }
+                    entry["option_docs"] = dict(items)
                 except Exception:
                     entry["options"] = []
             result["parameters"].append(entry)
 
-        return _ok(result)
-    except Exception as e:
-        return _err(f"Failed to inspect '{node_internal_id}': {e}")
+        return result
     finally:
+        # Only the spawned node is discarded; the tree is reused next call
         try:
-            bpy.data.node_groups.remove(temp_tree)
+            temp_tree.nodes.remove(node)
         except Exception:
             pass
 
+def get_node_details(node_internal_id: str) -> Dict[str, Any]:
+    """
+    Inspect a specific Geometry Node by internal ID, returning:
+    - id, label, description
+    - inputs: [{name, identifier, type, default}]
+    - outputs: [{name, identifier, type}]
+    - parameters: non-socket RNA properties (ENUM options included)
+    Uses a reusable inspector GeometryNodeTree to safely spawn and introspect the node.
+    """
+    if not isinstance(node_internal_id, str) or not node_internal_id.strip():
+        return _err("node_internal_id must be a non-empty string.")
+
+    try:
+        return _ok(_introspect_node(node_internal_id))
+    except Exception as e:
+        return _err(f"Failed to inspect '{node_internal_id}': {e}")
+
 
 def get_current_context() -> Dict[str, Any]:
     """
@@ -228,7 +326,8 @@ def _serialize_interface(node_tree: bpy.types.GeometryNodeTree) -> Dict[str, Any
         # Blender 4.x provides items_tree to traverse interface items
         items = getattr(iface, "items_tree", [])
         for item in items:
-            if isinstance(item, bpy.types.NodeTreeInterfaceSocket):
+            # Plain string compare instead of an isinstance walk over RNA classes
+            if getattr(item, "item_type", None) == 'SOCKET':
                 rec = {
                     "name": item.name,
                     "identifier": getattr(item, "identifier", item.name),
@@ -243,6 +342,19 @@ def _serialize_interface(node_tree: bpy.types.GeometryNodeTree) -> Dict[str, Any
         pass
     return out
 
+def _serialize_input_socket(sock, include_values: bool) -> Dict[str, Any]:
+    """Input socket entry; defaults only for unlinked sockets when requested."""
+    is_linked = bool(getattr(sock, "is_linked", False))
+    entry = {
+        "name": sock.name,
+        "identifier": sock.identifier,
+        "type": sock.bl_idname,
+        "is_linked": is_linked
+    }
+    if include_values and not is_linked:
+        entry["default"] = _safe_get_default(sock)
+    return entry
+
 def _serialize_node(node: bpy.types.Node, include_values: bool) -> Dict[str, Any]:
     data = {
         "name": node.name,
@@ -256,32 +368,36 @@ def _serialize_node(node: bpy.types.Node, include_values: bool) -> Dict[str, Any
         "inputs": [],
         "outputs": []
     }
+    # Comprehensions keep per-socket work out of Python-level append calls
     # Inputs
-    for sock in node.inputs:
-        sock_entry = {
-            "name": sock.name,
-            "identifier": sock.identifier,
-            "type": sock.bl_idname,
-            "is_linked": bool(getattr(sock, "is_linked", False))
-        }
-        if include_values and not sock_entry["is_linked"]:
-            sock_entry["default"] = _safe_get_default(sock)
-        data["inputs"].append(sock_entry)
+    data["inputs"] = [_serialize_input_socket(sock, include_values) for sock in node.inputs]
     # Outputs
-    for sock in node.outputs:
-        data["outputs"].append({
+    data["outputs"] = [
+        {
             "name": sock.name,
             "identifier": sock.identifier,
             "type": sock.bl_idname,
             "is_linked": bool(getattr(sock, "is_linked", False))
-        })
+        }
+        for sock in node.outputs
+    ]
     return data
 
-def _serialize_links(node_tree: bpy.types.GeometryNodeTree) -> List[Dict[str, Any]]:
+def _serialize_links(
+    node_tree: bpy.types.GeometryNodeTree,
+    node_names: Optional[set] = None
+) -> List[Dict[str, Any]]:
+    """
+    Serialize links; when node_names is given, keep only links touching those nodes.
+    """
     links_out: List[Dict[str, Any]] = []
     try:
         for link in node_tree.links:
             try:
+                if node_names is not None and (
+                    link.from_node.name not in node_names and link.to_node.name not in node_names
+                ):
+                    continue
                 links_out.append({
                     "from": {
                         "node": link.from_node.name,
@@ -303,12 +419,14 @@ def get_node_tree_json(
     tree_name: Optional[str] = None,
     object_name: Optional[str] = None,
     include_values: bool = True,
-    max_nodes: Optional[int] = None
+    max_nodes: Optional[int] = None,
+    offset: int = 0
 ) -> Dict[str, Any]:
     """
     Serialize a Geometry Node tree to JSON-like data:
     {
       "tree": {...meta...},
+      "total": <node count>, "offset": <first node index>,
       "interface": {"inputs":[], "outputs":[]},
       "nodes": [ { ... }, ... ],
       "links": [ { "from": {...}, "to": {...} }, ... ]
@@ -318,6 +436,12 @@ def get_node_tree_json(
     - If tree_name is provided and exists in bpy.data.node_groups, use it.
     - Else, if object_name provided, use its first NODES modifier's node_group.
     - Else, use active object's first NODES modifier's node_group.
+
+    Paging: pass offset/max_nodes to fetch nodes[offset:offset+max_nodes].
+    When that window doesn't cover the whole tree, links are limited to
+    those touching at least one returned node; links between two nodes
+    outside the window are omitted (they come with the page holding either
+    end). Keep fetching until offset + len(nodes) == total.
     """
     node_tree: Optional[bpy.types.GeometryNodeTree] = None
 
@@ -347,18 +471,27 @@ def get_node_tree_json(
             "type": node_tree.bl_idname
         },
         "interface": _serialize_interface(node_tree),
+        "total": 0,
+        "offset": 0,
         "nodes": [],
         "links": []
     }
 
-    # Nodes with optional cap
-    all_nodes = list(node_tree.nodes)
+    # Nodes: optional page window, sliced on the RNA collection itself
+    nodes = node_tree.nodes
+    total = len(nodes)
+    start = offset if isinstance(offset, int) and offset > 0 else 0
     if isinstance(max_nodes, int) and max_nodes > 0:
-        all_nodes = all_nodes[:max_nodes]
-    out["nodes"] = [_serialize_node(n, include_values) for n in all_nodes]
+        page = nodes[start:start + max_nodes]
+    else:
+        page = nodes[start:]
+    out["total"] = total
+    out["offset"] = start
+    out["nodes"] = [_serialize_node(n, include_values) for n in page]
 
-    # Links
-    out["links"] = _serialize_links(node_tree)
+    # Links (all of them when the page covers the whole tree)
+    partial = len(out["nodes"]) < total
+    out["links"] = _serialize_links(node_tree, {n["name"] for n in out["nodes"]} if partial else None)
 
     return _ok(out)
 
@@ -388,8 +521,13 @@ def ensure_geo_modifier(
 
     # Make object active & selected for operators
     bpy.context.view_layer.objects.active = obj
-    for o in bpy.context.selected_objects:
-        o.select_set(False)
+    try:
+        # One batched operator call instead of a select_set per object
+        bpy.ops.object.select_all(action='DESELECT')
+    except RuntimeError:
+        # Operator context unavailable (e.g. headless); deselect one by one
+        for o in bpy.context.selected_objects:
+            o.select_set(False)
     obj.select_set(True)
 
     # --- Add a Geometry Nodes modifier like the UI does ---
@@ -411,37 +549,33 @@ def ensure_geo_modifier(
     nodes = tree.nodes
 
     # 1) Interface sockets: make sure we have Geometry in/out (Blender 4.0+ API)
-    # Check if "Geometry" exists in interface items
-    
-    # Input Socket
-    has_geo_input = False
-    for item in tree.interface.items_tree:
-        if item.item_type == 'SOCKET' and item.in_out == 'INPUT' and item.name == "Geometry":
+    # Check if "Geometry" exists in interface items (single pass for both directions)
+    interface = tree.interface
+    has_geo_input = has_geo_output = False
+    for item in tuple(interface.items_tree):
+        if item.item_type != 'SOCKET' or item.name != "Geometry":
+            continue
+        if item.in_out == 'INPUT':
             has_geo_input = True
-            break
+        elif item.in_out == 'OUTPUT':
+            has_geo_output = True
     
     if not has_geo_input:
         # Create input socket: name="Geometry", in_out='INPUT', socket_type='NodeSocketGeometry'
-        tree.interface.new_socket("Geometry", in_out='INPUT', socket_type='NodeSocketGeometry')
-
-    # Output Socket
-    has_geo_output = False
-    for item in tree.interface.items_tree:
-        if item.item_type == 'SOCKET' and item.in_out == 'OUTPUT' and item.name == "Geometry":
-            has_geo_output = True
-            break
+        interface.new_socket("Geometry", in_out='INPUT', socket_type='NodeSocketGeometry')
 
     if not has_geo_output:
         # Create output socket: name="Geometry", in_out='OUTPUT', socket_type='NodeSocketGeometry'
-        tree.interface.new_socket("Geometry", in_out='OUTPUT', socket_type='NodeSocketGeometry')
+        interface.new_socket("Geometry", in_out='OUTPUT', socket_type='NodeSocketGeometry')
 
     # 2) Ensure Group Input / Group Output nodes exist
     group_input = None
     group_output = None
     for n in nodes:
-        if n.bl_idname == "NodeGroupInput":
+        bl_idname = n.bl_idname
+        if bl_idname == "NodeGroupInput":
             group_input = n
-        elif n.bl_idname == "NodeGroupOutput":
+        elif bl_idname == "NodeGroupOutput":
             group_output = n
 
     if group_input is None:
@@ -473,10 +607,41 @@ def ensure_geo_modifier(
 # 4) Script execution (sandboxed)
 # ------------------------------
 
-_FORBIDDEN_SNIPPETS = [
-    "import os", "import sys", "import subprocess", "import shutil",
-    "__import__('os')", "__import__(\"os\")"
-]
+_FORBIDDEN_MODULES = frozenset({"os", "sys", "subprocess", "shutil"})
+
+def _find_forbidden_import(tree: ast.AST) -> Optional[str]:
+    """
+    Walk the parsed script once and return the first forbidden module it
+    imports (import x / from x import y / __import__('x')), else None.
+    Unlike substring matching this is not fooled by extra whitespace.
+    """
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom):
+            names = [node.module or ""]
+        elif (isinstance(node, ast.Call) and isinstance(node.func, ast.Name)
+                and node.func.id == "__import__" and node.args
+                and isinstance(node.args[0], ast.Constant) and isinstance(node.args[0].value, str)):
+            names = [node.args[0].value]
+        else:
+            continue
+        for name in names:
+            if name.split(".", 1)[0] in _FORBIDDEN_MODULES:
+                return name
+    return None
+
+# Source -> compiled code for scripts that passed the import check. Keyed by the
+# source itself (not its hash) so a hash collision can never run the wrong code.
+_CODE_CACHE_SIZE = 128
+_CODE_CACHE: Dict[str, CodeType] = {}
+
+# Globals prototype for executed scripts
+_EXEC_BASE: Dict[str, Any] = {
+    "bpy": bpy,
+    "math": math,
+    "random": random,
+}
 
 def execute_script(script_content: str) -> Dict[str, Any]:
     """
@@ -486,17 +651,26 @@ def execute_script(script_content: str) -> Dict[str, Any]:
     if not isinstance(script_content, str) or not script_content.strip():
         return _err("script_content must be a non-empty string.")
 
-    for ban in _FORBIDDEN_SNIPPETS:
-        if ban in script_content:
-            return _err(f"Security violation: '{ban}' is not allowed.")
-
-    ctx = {
-        "bpy": bpy,
-        "math": __import__("math"),
-        "random": __import__("random"),
-    }
+    # Agent retries often resend the same script; reuse its vetted code object
+    code = _CODE_CACHE.get(script_content)
+    if code is None:
+        try:
+            tree = ast.parse(script_content)
+            banned = _find_forbidden_import(tree)
+            if banned:
+                return _err(f"Security violation: importing '{banned}' is not allowed.")
+            code = compile(tree, "<agent>", "exec")
+        except SyntaxError as e:
+            return _err(f"Python Execution Error: {e}")
+        if len(_CODE_CACHE) >= _CODE_CACHE_SIZE:
+            # FIFO eviction: dicts keep insertion order
+            del _CODE_CACHE[next(iter(_CODE_CACHE))]
+        _CODE_CACHE[script_content] = code
+
+    # Fresh copy per run so one script's globals never leak into the next
+    ctx = _EXEC_BASE.copy()
     try:
-        exec(script_content, ctx)
+        exec(code, ctx)
         # attempt to refresh view layer if possible
         try:
             if bpy.context.active_object:
@@ -508,6 +682,20 @@ def execute_script(script_content: str) -> Dict[str, Any]:
     except Exception as e:
         return _err(f"Python Execution Error: {e}")
 
+def clear_caches() -> None:
+    """
+    Drop memoized introspection results and the inspector tree
+    (called on addon unregister/reload).
+    """
+    _search_cached.cache_clear()
+    _geo_node_index.cache_clear()
+    _introspect_node.cache_clear()
+    _CODE_CACHE.clear()
+    try:
+        _remove_inspector_tree()
+    except Exception:
+        pass # bpy.data can be restricted while Blender is shutting down
+
 # ------------------------------
 # 5) Tool registry and specs
 # ------------------------------
@@ -548,9 +736,10 @@ def get_tool_spec() -> Dict[str, Any]:
                 "tree_name": "Optional[str]",
                 "object_name": "Optional[str]",
                 "include_values": "bool",
-                "max_nodes": "Optional[int]"
+                "max_nodes": "Optional[int]",
+                "offset": "int"
             },
-            "returns": "{tree, interface, nodes[], links[]}"
+            "returns": "{tree, interface, total, offset, nodes[], links[]}"
         },
         "ensure_geo_modifier": {
             "args": {
@@ -0,0 +1,124 @@
+# agent_service/blender_client.py
+# Socket client for the Blender addon's length-prefixed JSON server. Shared by
+# the MCP stdio server and the agent service, which each keep one connection.
+
+import socket
+import json
+import struct
+import threading
+
+# Compact, fast encoding for the internal Blender hop; orjson when installed
+try:
+    import orjson
+    _dumps = orjson.dumps
+    _loads = orjson.loads
+except ImportError:
+    def _dumps(obj):
+        return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+    _loads = json.loads
+
+# Configuration
+BLENDER_HOST = "127.0.0.1"
+BLENDER_PORT = 8081
+RECV_CHUNK = 64 * 1024  # Max bytes per recv syscall
+
+# Persistent connection to Blender, shared by all tool calls
+_sock = None
+_sock_lock = threading.Lock()
+
+class _StaleConnection(ConnectionError):
+    """Blender closed a reused connection before replying (e.g. server restart)."""
+
+def _connect() -> socket.socket:
+    s = socket.create_connection((BLENDER_HOST, BLENDER_PORT), timeout=10.0) # 10s timeout
+    # Small JSON commands shouldn't wait on Nagle
+    s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    return s
+
+def _close_socket():
+    global _sock
+    if _sock is not None:
+        try:
+            _sock.close()
+        except OSError:
+            pass
+        _sock = None
+
+def _roundtrip(s: socket.socket, prefix: bytes, msg_bytes: bytes) -> dict:
+    """Send one framed request on s and read one framed response."""
+    # Send prefix + body in one syscall (sendmsg is unavailable on Windows)
+    if hasattr(s, "sendmsg"):
+        sent = s.sendmsg([prefix, msg_bytes])
+        if sent < len(prefix):
+            s.sendall(prefix[sent:])
+            s.sendall(msg_bytes)
+        elif sent < len(prefix) + len(msg_bytes):
+            s.sendall(memoryview(msg_bytes)[sent - len(prefix):])
+    else:
+        s.sendall(prefix + msg_bytes)
+    
+    # Receive Length
+    raw_len = s.recv(4)
+    if not raw_len:
+        raise _StaleConnection("Blender closed connection unexpectedly")
+    while len(raw_len) < 4:
+        more = s.recv(4 - len(raw_len))
+        if not more:
+            raise ConnectionError("Blender closed connection unexpectedly")
+        raw_len += more
+    resp_len = struct.unpack('>I', raw_len)[0]
+    if resp_len == 0:
+        # The listener answers an empty or oversized request with an empty frame
+        return {"ok": False, "error": "Request rejected by Blender (empty or exceeds MAX_MESSAGE_SIZE)."}
+    
+    # Receive Body (into one preallocated buffer, no intermediate chunks)
+    buf = bytearray(resp_len)
+    view = memoryview(buf)
+    bytes_recd = 0
+    while bytes_recd < resp_len:
+        n = s.recv_into(view[bytes_recd:], min(resp_len - bytes_recd, RECV_CHUNK))
+        if not n:
+            raise ConnectionError("Blender closed connection mid-response")
+        bytes_recd += n
+        
+    return _loads(buf)
+
+def send_to_blender(tool_name: str, params: dict = None) -> dict:
+    """
+    Helper to send JSON commands to the internal Blender socket server.
+    Reuses one persistent connection; a reused connection that turns out to be
+    closed is reopened and the request retried once.
+    """
+    global _sock
+    if params is None:
+        params = {}
+        
+    payload = {
+        "tool": tool_name,
+        "params": params
+    }
+    
+    # Prepare Message
+    msg_bytes = _dumps(payload)
+    # Big-Endian 4-byte length prefix
+    prefix = struct.pack('>I', len(msg_bytes))
+    
+    with _sock_lock:
+        for attempt in range(2):
+            reused = _sock is not None
+            try:
+                if _sock is None:
+                    _sock = _connect()
+                return _roundtrip(_sock, prefix, msg_bytes)
+            except ConnectionRefusedError:
+                _close_socket()
+                return {"ok": False, "error": "Blender is not running or Server is stopped."}
+            except (_StaleConnection, BrokenPipeError, ConnectionResetError, ConnectionAbortedError) as e:
+                # Only retry on a reused socket: a fresh one failing means Blender itself did
+                _close_socket()
+                if not reused or attempt:
+                    return {"ok": False, "error": str(e)}
+            except Exception as e:
+                # Any other failure (e.g. timeout) leaves the stream out of sync
+                _close_socket()
+                return {"ok": False, "error": str(e)}
@@ -1,18 +1,29 @@
 # agent_service/src/agents_adk.py
 
+import io
 import os
+import asyncio
 import logging
 import sys
-from typing import Dict
+import json
+import itertools
+import contextlib
+from collections import OrderedDict
+from typing import Any, AsyncGenerator, AsyncIterator, Dict, Optional
 
 # ADK Imports
-from google.adk.agents import LlmAgent, SequentialAgent, LoopAgent
+from google.adk.agents import BaseAgent, LlmAgent, SequentialAgent, LoopAgent
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.agents.context_cache_config import ContextCacheConfig
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.models import LlmRequest
+from google.adk.events import Event, EventActions
+from google.adk.apps import App
 from google.adk.runners import Runner
 from google.adk.sessions import InMemorySessionService
 from google.adk.tools import FunctionTool
 from google.adk.tools.tool_context import ToolContext
 from google.genai import types
-from google.adk.tools import exit_loop 
 
 # Enable for Debugging Logs.
   # from google.adk.plugins.logging_plugin import LoggingPlugin
@@ -28,48 +39,260 @@ from google.adk.tools.mcp_tool.mcp_toolset import McpToolset
 from google.adk.tools.mcp_tool.mcp_session_manager import StdioConnectionParams
 from mcp import StdioServerParameters
 
+from ..blender_client import send_to_blender
+
 # --- CONFIG & LOGGING ---
 MODEL_NAME = "gemini-2.5-flash"
+# The Developer's first attempt runs on the cheaper tier; a failed script escalates to MODEL_NAME
+DEVELOPER_FAST_MODEL = "gemini-2.5-flash-lite"
 logger = logging.getLogger(__name__)
 
 # Path to your mcp_server.py (assumed to be one level up)
 MCP_SERVER_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "mcp_server.py"))
 
 # --- 1. SETUP MCP TOOLSET ---
-logger.info(f"Initializing MCP Toolset pointing to: {MCP_SERVER_PATH}")
-
-blender_mcp_toolset = McpToolset(
-    connection_params=StdioConnectionParams(
-        server_params=StdioServerParameters(
-            command=sys.executable,
-            args=[MCP_SERVER_PATH],
-            env=os.environ.copy()
+logger.info("Initializing MCP Toolset pointing to: %s", MCP_SERVER_PATH)
+
+def _make_toolset(tool_filter=None) -> McpToolset:
+    return McpToolset(
+        connection_params=StdioConnectionParams(
+            server_params=StdioServerParameters(
+                command=sys.executable,
+                args=[MCP_SERVER_PATH],
+                env=os.environ.copy()
+            ),
+            timeout=60,
         ),
-        timeout=60,
+        tool_filter=tool_filter,
     )
+
+# One shared MCP session (and Blender connection) per worker. The raw MCP
+# execute_script is filtered out: agents run scripts through the escalating
+# wrapper defined with the agents below.
+blender_mcp_toolset = _make_toolset(
+    tool_filter=[
+        "get_current_context", "get_node_tree_json", "get_node_tree_page",
+        "search_node_types", "get_node_details", "ensure_geo_modifier",
+    ]
+)
+
+MCP_HEARTBEAT_S = 30
+
+async def warm_up_toolset():
+    """
+    Open the MCP stdio session up front (spawn, handshake, tool listing) so the
+    first /chat request doesn't pay for it. The toolset keeps the session
+    alive and reuses it for every run.
+    """
+    tools = await blender_mcp_toolset.get_tools()
+    logger.info("MCP Toolset ready with %s tools.", len(tools))
+
+async def mcp_heartbeat():
+    """Keep the stdio session warm; list_tools is a cheap round-trip that never touches Blender."""
+    while True:
+        await asyncio.sleep(MCP_HEARTBEAT_S)
+        try:
+            await blender_mcp_toolset.get_tools()
+        except Exception as e:
+            logger.warning("MCP heartbeat failed: %s", e)
+
+async def close_toolset():
+    """Shut down the MCP stdio session and its subprocess."""
+    await blender_mcp_toolset.close()
+
+# --- 2. TOOL-CALL CACHE ---
+# Read-only tools are idempotent between mutations, so repeats within one run
+# (e.g. the Developer re-reading the tree after a failed script) are served locally.
+TOOL_CACHE_MAX_ENTRIES = 64
+TOOL_CACHE_MAX_RUNS = 32
+
+_SCENE_READ_TOOLS = {"get_current_context", "get_node_tree_json", "get_node_tree_page"}
+_TYPE_READ_TOOLS = {"search_node_types", "get_node_details"}  # bpy.types data, unaffected by scripts
+_MUTATING_TOOLS = {"execute_script", "ensure_geo_modifier"}
+_RETAINED_TOOLS = {"get_node_tree_json", "get_node_tree_page"}  # largest results, evicted last
+
+# invocation_id -> OrderedDict[(tool_name, args_json), response]
+_tool_caches: "OrderedDict[str, OrderedDict]" = OrderedDict()
+
+def _run_cache(tool_context: ToolContext) -> OrderedDict:
+    cache = _tool_caches.get(tool_context.invocation_id)
+    if cache is None:
+        cache = _tool_caches[tool_context.invocation_id] = OrderedDict()
+        while len(_tool_caches) > TOOL_CACHE_MAX_RUNS:
+            _tool_caches.popitem(last=False)
+    return cache
+
+def _tool_key(tool, args: Dict[str, Any]) -> tuple:
+    return tool.name, json.dumps(args, sort_keys=True, default=str)
+
+def _evict(cache: OrderedDict) -> None:
+    """Drop the least recently used entry, sparing node-tree results while others remain."""
+    for key in cache:
+        if key[0] not in _RETAINED_TOOLS:
+            del cache[key]
+            return
+    cache.popitem(last=False)
+
+def _blender_ok(tool_response) -> bool:
+    """
+    Whether Blender reported success. MCP results wrap Blender's {"ok": ..., ...}
+    reply as JSON text content, with isError false even when ok is false.
+    """
+    if not isinstance(tool_response, dict) or tool_response.get("isError"):
+        return False
+    if "ok" in tool_response:
+        return bool(tool_response["ok"])
+    for item in tool_response.get("content") or ():
+        if isinstance(item, dict) and item.get("type") == "text":
+            try:
+                return bool(json.loads(item.get("text") or "").get("ok"))
+            except (ValueError, AttributeError):
+                return False
+    return False
+
+def cached_tool_call(tool, args: Dict[str, Any], tool_context: ToolContext) -> Optional[dict]:
+    """before_tool_callback: return a cached response (skipping the call) or None to run the tool."""
+    if tool.name in _MUTATING_TOOLS:
+        cache = _run_cache(tool_context)
+        for key in [k for k in cache if k[0] in _SCENE_READ_TOOLS]:
+            del cache[key]
+        return None
+    if tool.name not in _SCENE_READ_TOOLS and tool.name not in _TYPE_READ_TOOLS:
+        return None
+
+    cache = _run_cache(tool_context)
+    key = _tool_key(tool, args)
+    response = cache.get(key)
+    if response is not None:
+        cache.move_to_end(key)
+        logger.debug("Tool cache hit: %s", tool.name)
+    return response
+
+def store_tool_result(tool, args: Dict[str, Any], tool_context: ToolContext, tool_response) -> Optional[dict]:
+    """after_tool_callback: remember successful read-only results; never alters the response."""
+    if tool.name not in _SCENE_READ_TOOLS and tool.name not in _TYPE_READ_TOOLS:
+        return None
+    # Errors like "Blender is not running" or a timeout must not be replayed for the whole run
+    if not _blender_ok(tool_response):
+        return None
+
+    cache = _run_cache(tool_context)
+    key = _tool_key(tool, args)
+    cache[key] = tool_response
+    cache.move_to_end(key)
+    while len(cache) > TOOL_CACHE_MAX_ENTRIES:
+        _evict(cache)
+    return None
+
+# --- 3. DEFINE AGENTS ---
+
+# Agent 1a: Probes (each fetches one piece of scene info, in sequence: every call
+# shares one Blender connection and runs on Blender's main thread anyway)
+# Role: Direct Blender calls, no LLM turn; the raw JSON goes straight into session
+# state for the Architect, so nothing is re-typed (or truncated) by a model.
+_PROBE_STOPWORDS = frozenset({
+    "user", "request", "please", "make", "create", "want", "with", "that", "this",
+    "from", "into", "onto", "using", "each", "some", "them", "then", "have", "like",
+    "should", "would", "could", "geometry", "node", "nodes", "setup", "object",
+})
+PROBE_TREE_MAX_NODES = 200  # larger trees are paged in by the Architect via get_node_tree_page
+MAX_PROBE_TERMS = 8  # each search is one Blender round-trip; terms with no match are dropped
+
+def _compact_json(value: Any) -> str:
+    return json.dumps(value, separators=(",", ":"), default=str)
+
+def _node_search_terms(text: str) -> list:
+    """Candidate node-type search terms: distinct content words of the request."""
+    terms = []
+    for word in "".join(c if c.isalnum() else " " for c in text.lower()).split():
+        if len(word) < 4 or word in _PROBE_STOPWORDS:
+            continue
+        if word not in terms:
+            terms.append(word)
+            if len(terms) >= MAX_PROBE_TERMS:
+                break
+    return terms
+
+class BlenderProbe(BaseAgent):
+    """Runs one read-only Blender tool and stores its raw JSON result under output_key."""
+    tool_name: str
+    output_key: str
+    params: Optional[Dict[str, Any]] = None
+
+    async def _fetch(self, ctx: InvocationContext) -> Any:
+        return await asyncio.to_thread(send_to_blender, self.tool_name, self.params)
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        try:
+            value = await self._fetch(ctx)
+        except Exception as e:
+            value = {"ok": False, "error": str(e)}
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            actions=EventActions(state_delta={self.output_key: _compact_json(value)}),
+        )
+
+class NodeTypeProbe(BlenderProbe):
+    """Searches node types for each content word of the request; results keyed by term."""
+    tool_name: str = "search_node_types"
+
+    async def _fetch(self, ctx: InvocationContext) -> Any:
+        parts = ctx.user_content.parts if ctx.user_content else None
+        text = " ".join(part.text for part in parts or () if part.text)
+        results = {}
+        for term in _node_search_terms(text):
+            found = await asyncio.to_thread(send_to_blender, self.tool_name, {"query": term})
+            if not (found.get("ok") and found.get("data")) and len(term) > 4 and term.endswith("s"):
+                # Plural with no match ("cubes"): retry the singular ("cube")
+                term = term[:-1]
+                found = await asyncio.to_thread(send_to_blender, self.tool_name, {"query": term})
+            if found.get("ok") and found.get("data"):
+                results[term] = found["data"]
+        return results
+
+context_probe = BlenderProbe(name="ContextProbe", tool_name="get_current_context", output_key="ctx_json")
+
+nodetree_probe = BlenderProbe(
+    name="NodeTreeProbe",
+    tool_name="get_node_tree_json",
+    output_key="tree_json",
+    params={"max_nodes": PROBE_TREE_MAX_NODES},
 )
 
-# --- 2. DEFINE AGENTS ---
+nodetype_probe = NodeTypeProbe(name="NodeTypeProbe", output_key="nodes_json")
+
+scene_probes = SequentialAgent(
+    name="ArchitectProbes",
+    sub_agents=[context_probe, nodetree_probe, nodetype_probe]
+)
 
-# Agent 1: Architect output JSON structured plan.
-# Role: Analyzes scene, creates plan, does NOT write code.
+# Agent 1b: Architect output JSON structured plan.
+# Role: Analyzes scene (from the probes), creates plan, does NOT write code.
 architect_agent = LlmAgent(
     name="Architect",
     model=MODEL_NAME,
     generate_content_config= types.GenerateContentConfig(
-    max_output_tokens=5000,
+    max_output_tokens=2048,  # the JSON plan is small
     temperature=0.3,
     ),
 
     instruction="""
     You are an Expert Architect/Planner for creating a Blender Geometry Node Setup.
     Goal: Analyze the user request and create a technical plan for it.
+
+    Scene information already gathered for you:
+    - Current context (active object and it's modifiers): {ctx_json?}
+    - Current node tree structure: {tree_json?}
+    - Candidate node types for this request: {nodes_json?}
     
     Steps:
-    1. CALL 'get_current_context' tool to understand the active object and it's current state.
+    1. Read the current context above to understand the active object and it's current state.
     2. If, don't find any applied Gometry Node Modifier on the active object:
         - Then, only CALL 'ensure_geo_modifier' tool.
-    3. CALL 'get_node_tree_json' tool with active object name to understand it's current node tree structure.
+    3. Read the node tree structure above to understand the current node tree (ignore it if Step 2 created a new modifier).
+        - If its "total" is larger than the number of nodes listed, CALL 'get_node_tree_page' with offset = nodes listed so far, until you have read them all.
     4. Based on the user request and results of Step 1, 2, and 3. DESIGN a step-by-step plan in JSON to implement the required Geometry Nodes setup. .
     
      JSON Structure:
@@ -81,21 +304,48 @@ architect_agent = LlmAgent(
     }
 
     Only do this, when you have no other choice:
-       - If you unsure of node names, their parameters, and details that you need to add, then CALL 'search_node_types' and 'get_node_details' tools to get the list of nodes and their parameters.
+       - If the candidate node types above are not enough and you unsure of node names, their parameters, and details that you need to add, then CALL 'search_node_types' and 'get_node_details' tools to get the list of nodes and their parameters.
     
     Constraints:
     - Just output the JSON plan as per the structure above.
     - Do NOT write any code here.
     """,
     tools=[blender_mcp_toolset],
+    before_tool_callback=cached_tool_call,
+    after_tool_callback=store_tool_result,
     output_key="technical_plan"
 )
 
+async def execute_script(script_content: str, tool_context: ToolContext) -> dict:
+    """
+    Execute a Python script inside Blender.
+    The script has access to 'bpy', 'math', 'random'.
+    Dangerous imports (os, subprocess) are blocked.
+    Returns {"ok": true, ...} on success or {"ok": false, "error": ...} with the error to fix.
+    """
+    result = await asyncio.to_thread(send_to_blender, "execute_script", {"script_content": script_content})
+    if result.get("ok"):
+        # Success ends the DevLoop right here, without another Developer LLM turn:
+        # escalate breaks the loop, skip_summarization makes this response the final event
+        tool_context.actions.escalate = True
+        tool_context.actions.skip_summarization = True
+    else:
+        tool_context.state["dev_failures"] = tool_context.state.get("dev_failures", 0) + 1
+    return result
+
+execute_script_tool = FunctionTool(func=execute_script)
+
+def select_developer_model(callback_context: CallbackContext, llm_request: LlmRequest):
+    """before_model_callback: stay on the fast tier until a script has failed, then escalate."""
+    if callback_context.state.get("dev_failures", 0):
+        llm_request.model = MODEL_NAME
+    return None
+
 # Agent 2: Developer (Combines Scripter, Executor, and Debugger)
 # Role: Writes code, Runs it, Fixes it.
 developer_agent = LlmAgent(
     name="Developer",
-    model=MODEL_NAME,
+    model=DEVELOPER_FAST_MODEL,
     generate_content_config= types.GenerateContentConfig(
     max_output_tokens=5000,
     temperature=0.3,
@@ -108,8 +358,7 @@ developer_agent = LlmAgent(
       2. WRITE a python script based on the plan.
       3. IMMEDIATELY call the 'execute_script' tool with the script.
       4. ANALYZE the result:
-         - If return is "Success".
-             - Call 'exit_loop' tool.
+         - If return is "Success", you are done (the loop ends automatically).
          - If return is an Error (e.g., AttributeError, NameError):
              - Then, try to solve the error in the next response iteration.
 
@@ -119,10 +368,13 @@ developer_agent = LlmAgent(
     - Focus only on Geometry Nodes related code.
     """,
     output_key="Script",
-    tools=[blender_mcp_toolset, exit_loop],
+    tools=[blender_mcp_toolset, execute_script_tool],
+    before_model_callback=select_developer_model,
+    before_tool_callback=cached_tool_call,
+    after_tool_callback=store_tool_result,
 )
 
-# --- 3. PIPELINE SETUP ---
+# --- 4. PIPELINE SETUP ---
 
 # The Developer talks to itself (and the tools) until it succeeds or hits the limit.
 coding_loop = LoopAgent(
@@ -131,77 +383,231 @@ coding_loop = LoopAgent(
     max_iterations=3  # Allow 3 attempts to fix bugs
 )
 
+# Probes gather the scene without LLM turns, then the Architect plans from their results
+planning_stage = SequentialAgent(
+    name="PlanningStage",
+    sub_agents=[scene_probes, architect_agent]
+)
+
 # Linear flow: Plan -> Build
 main_pipeline = SequentialAgent(
     name="FastBlenderPipeline",
-    sub_agents=[architect_agent, coding_loop]
+    sub_agents=[planning_stage, coding_loop]
+)
+
+# --- 5. RUNNER ---
+# Gemini context caching: ADK moves the static prefix (system instruction, tools, prior turns)
+# into a CachedContent and reuses it across the DevLoop's turns. Requests below min_tokens
+# (the API's minimum cacheable size) are sent uncached, so it only kicks in for big plans/trees.
+CONTEXT_CACHE_MIN_TOKENS = 2048
+context_cache_config = ContextCacheConfig(
+    min_tokens=CONTEXT_CACHE_MIN_TOKENS,
+    ttl_seconds=300,      # comfortably longer than one run (PIPELINE_TIMEOUT_S)
+    cache_intervals=10,   # refresh the cache after this many reuses
+)
+
+blender_app = App(
+    name="BlenderAgentService",
+    root_agent=main_pipeline,
+    context_cache_config=context_cache_config,
+    # plugins=[LoggingPlugin()],   # Enable for Debugging Logs.
 )
 
-# --- 4. RUNNER ---
 session_service = InMemorySessionService()
 runner = Runner(
-    agent=main_pipeline,
-    app_name="BlenderAgentService",
+    app=blender_app,
     session_service=session_service, 
-    # plugins=[LoggingPlugin()],   # Enable for Debugging Logs.
 )
 
-# --- 5. PUBLIC API ---
+# --- 6. PUBLIC API ---
 
-async def run_blender_pipeline(user_prompt: str):
+_Content, _Part = types.Content, types.Part
+
+_RESULT_TEXT_AUTHORS = (architect_agent.name, developer_agent.name)
+
+# next() on itertools.count is atomic under the GIL, so this is safe across threads
+_session_counter = itertools.count(1)
+
+def pipeline_timeout_s() -> float:
+    """Wall-clock budget for one run (read per call, since main.py loads .env after importing us)."""
+    return float(os.getenv("PIPELINE_TIMEOUT_S", "90"))
+
+if sys.version_info >= (3, 11):
+    _timeout_at = asyncio.timeout_at
+else:
+    @contextlib.asynccontextmanager
+    async def _timeout_at(when: float):
+        """Minimal asyncio.timeout_at for Python 3.10: cancel the current task at `when`."""
+        task = asyncio.current_task()
+        fired = False
+
+        def _expire():
+            nonlocal fired
+            fired = True
+            task.cancel()
+
+        handle = asyncio.get_running_loop().call_at(when, _expire)
+        try:
+            yield
+        except asyncio.CancelledError:
+            if fired:
+                raise TimeoutError from None
+            raise
+        finally:
+            handle.cancel()
+
+async def _release_session(session, invocation_id: Optional[str]):
     """
-    Entry point for the FastAPI server or UI.
+    Sessions are one-shot (one request each), so drop them, and the run's tool
+    cache, once the response is out; otherwise InMemorySessionService keeps
+    every request's event history for the life of the process.
     """
+    _tool_caches.pop(invocation_id, None)
+    try:
+        await session_service.delete_session(
+            app_name=session.app_name,
+            user_id=session.user_id,
+            session_id=session.id
+        )
+    except Exception as e:
+        logger.warning("Failed to delete session %s: %s", session.id, e)
+
+async def _pipeline_events(user_prompt: str) -> AsyncIterator[dict]:
+    """
+    Run the pipeline, yielding the stream_blender_pipeline events; the result
+    event also carries the internal "replayable" flag for the response cache.
+    """
+    session = None
+    events = None
+    invocation_id = None
     try:
         # Construct the initial prompt
-        full_prompt = f"""
-        User Request: {user_prompt}
-        """
-        
-        message = types.Content(role="user", parts=[types.Part(text=full_prompt)])
+        message = _Content(role="user", parts=[_Part(text=f"User Request: {user_prompt}")])
         
         # Create a fresh session
         session = await session_service.create_session(
             app_name=runner.app_name,
             user_id="local_user",
-            session_id=f"session-{os.urandom(4).hex()}"
+            session_id=f"session-{next(_session_counter)}"
         )
         
-        last_script = None
-        final_text = ""
+        text_buf = io.StringIO()  # Architect plan + Developer text; every chunk is also streamed as it arrives
+        text_author = None        # author of the last buffered chunk
+        pending_scripts = {}  # function_call id -> script sent to execute_script
+        last_script = None    # last script that Blender ran successfully
+        mutations = 0         # scene-changing tool calls (ensure_geo_modifier, every execute_script)
         
-        logger.info(f"Starting Pipeline for session: {session.id}")
+        logger.info("Starting Pipeline for session: %s", session.id)
         
-        async for event in runner.run_async(
+        events = runner.run_async(
             user_id=session.user_id,
             session_id=session.id,
             new_message=message
-        ):
+        )
+        deadline = asyncio.get_running_loop().time() + pipeline_timeout_s()
+        timed_out = False
+
+        # The deadline only wraps each wait on the runner, never our own yields,
+        # so time spent by a slow streaming client isn't charged to the pipeline
+        while True:
+            try:
+                async with _timeout_at(deadline):
+                    event = await events.__anext__()
+            except StopAsyncIteration:
+                break
+            except TimeoutError:
+                # Cancelling the step already unwound the runner (LLM stream, MCP call)
+                logger.warning("Pipeline timed out for session: %s", session.id)
+                timed_out = True
+                break
+
+            invocation_id = event.invocation_id
+
             # Capture output streaming
             if event.content and event.content.parts:
                 for part in event.content.parts:
                     if part.text:
-                        text_chunk = part.text
-                        final_text = text_chunk
-                        
-                        # Simple heuristic to grab the final code block
-                        if "import bpy" in text_chunk:
-                            last_script = text_chunk
+                        # The planner's output and the Developer's words make up the COMPLETED text
+                        if event.author in _RESULT_TEXT_AUTHORS:
+                            if text_author not in (None, event.author):
+                                text_buf.write("\n\n")
+                            text_author = event.author
+                            text_buf.write(part.text)
+                        yield {"type": "text", "author": event.author, "text": part.text}
+
+                    # Take the script straight from the execute_script tool call
+                    call = part.function_call
+                    if call and call.name in _MUTATING_TOOLS:
+                        mutations += 1
+                    if call and call.name == "execute_script":
+                        pending_scripts[call.id] = (call.args or {}).get("script_content")
+
+                    resp = part.function_response
+                    if resp and resp.name == "execute_script":
+                        script = pending_scripts.pop(resp.id, None)
+                        if script and (resp.response or {}).get("ok"):
+                            last_script = script
+
+        final_text = text_buf.getvalue().strip()
 
         # Return the result
         if last_script:
-            return {
+            yield {
+                "type": "result",
                 "text": "Task Completed Successfully.", 
                 "code": last_script, 
-                "status": "SUCCESS"
+                "status": "SUCCESS",
+                # The script alone took the scene from its starting state to the result,
+                # so replaying it on that same state reproduces the run (see response_cache)
+                "replayable": mutations == 1
+            }
+        elif timed_out:
+            yield {
+                "type": "result",
+                "text": f"Timed out after {pipeline_timeout_s():g}s without a working script.", 
+                "code": None, 
+                "status": "TIMEOUT"
             }
         else:
-            return {
-                "text": "Task finished.", 
+            yield {
+                "type": "result",
+                "text": final_text or "Task finished.", 
                 "code": None, 
                 "status": "COMPLETED"
             }
             
     except Exception as e:
-        logger.error(f"Pipeline Error: {e}", exc_info=True)
-        return {"text": f"Critical Error: {str(e)}", "status": "ERROR"}
+        logger.error("Pipeline Error: %s", e, exc_info=True)
+        yield {"type": "result", "text": f"Critical Error: {str(e)}", "status": "ERROR"}
+    finally:
+        if events is not None:
+            # No-op when the run finished; cancels it if the client disconnected mid-stream
+            await events.aclose()
+        if session is not None:
+            await _release_session(session, invocation_id)
+
+async def stream_blender_pipeline(user_prompt: str) -> AsyncIterator[dict]:
+    """
+    Streaming entry point: yields events as the agents produce them.
+      {"type": "text", "author": <agent name>, "text": <chunk>}  for each text part
+      {"type": "result", "text": ..., "code": ..., "status": ...} once, at the end
+    """
+    # aclosing: a client disconnect closes the run right away, not at garbage collection
+    async with contextlib.aclosing(_pipeline_events(user_prompt)) as events:
+        async for event in events:
+            if event["type"] == "result":
+                event.pop("replayable", None)
+            yield event
+
+async def run_blender_pipeline(user_prompt: str):
+    """
+    Entry point for the FastAPI server or UI.
+    Consumes the stream and returns only the final result
+    (plus "replayable", which main.py does not forward).
+    """
+    result = {"text": "Task finished.", "code": None, "status": "COMPLETED"}
+    async with contextlib.aclosing(_pipeline_events(user_prompt)) as events:
+        async for event in events:
+            if event["type"] == "result":
+                result = {k: v for k, v in event.items() if k != "type"}
+    return result
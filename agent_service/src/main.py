@@ -1,14 +1,18 @@
 # agent_service/src/main.py
 import os
+import asyncio
 import logging
+import orjson
 import uvicorn
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from pydantic import BaseModel
 from dotenv import load_dotenv
 
 # Import the Google ADK Agent Pipeline
 # Ensure 'agent_service/src/agents_adk.py' exists!
-from .agents_adk import run_blender_pipeline
+from .agents_adk import run_blender_pipeline, stream_blender_pipeline, warm_up_toolset, mcp_heartbeat, close_toolset
+from .response_cache import run_cached
 
 # Load environment variables (e.g. GOOGLE_API_KEY from .env)
 load_dotenv()
@@ -18,12 +22,31 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("BlenderAgentService")
 
 # Initialize FastAPI
-app = FastAPI(title="Blender AI Agent Service")
+# orjson for every JSON response; /chat returns whole scripts in "code"
+app = FastAPI(title="Blender AI Agent Service", default_response_class=ORJSONResponse)
+
+# --- Lifecycle ---
+
+@app.on_event("startup")
+async def start_mcp_session():
+    """Open the long-lived MCP session once and keep it warm."""
+    try:
+        await warm_up_toolset()
+    except Exception as e:
+        # Not fatal: the toolset connects lazily on the first request instead
+        logger.warning("MCP warm-up failed: %s", e)
+    app.state.mcp_heartbeat = asyncio.create_task(mcp_heartbeat())
+
+@app.on_event("shutdown")
+async def stop_mcp_session():
+    app.state.mcp_heartbeat.cancel()
+    await close_toolset()
 
 # --- Data Models ---
 class ChatRequest(BaseModel):
+    # Older addon builds also send "history"; the pipeline doesn't use it, so it is
+    # left undeclared (ignored as an extra field) instead of validated per request.
     prompt: str
-    history: list = []  # Optional conversation history
 
 class ChatResponse(BaseModel):
     text: str
@@ -32,22 +55,24 @@ class ChatResponse(BaseModel):
 
 # --- Routes ---
 
-@app.get("/health")
+# Built once: the environment (loaded from .env above) doesn't change while the service runs
+_HEALTH_PAYLOAD = {
+    "status": "active", 
+    "agent_framework": "google-adk", 
+    "api_key_set": bool(os.environ.get("GEMINI_API_KEY"))
+}
+
+@app.get("/health", include_in_schema=False)
 async def health_check():
     """Check if the service is running and API key is present."""
-    has_key = bool(os.environ.get("GEMINI_API_KEY"))
-    return {
-        "status": "active", 
-        "agent_framework": "google-adk", 
-        "api_key_set": has_key
-    }
+    return _HEALTH_PAYLOAD
 
 @app.post("/chat", response_model=ChatResponse)
 async def chat_endpoint(request: ChatRequest):
     """
     Main Endpoint: Blender Addon -> FastAPI -> Google ADK Agent -> Blender Bridge
     """
-    logger.info(f"Received Request: {request.prompt}")
+    logger.info("Received Request: %s", request.prompt)
     
     # 1. Security Check
     if not os.environ.get("GEMINI_API_KEY"):
@@ -60,7 +85,8 @@ async def chat_endpoint(request: ChatRequest):
     try:
         # 2. Run the ADK Agent Pipeline (Sequential + Loop)
         # This function (from agents_adk.py) handles Planning -> Researching -> Coding -> Execution
-        result = await run_blender_pipeline(request.prompt)
+        # Optional response cache in front of it (BLENDER_AGENT_CACHE=1)
+        result = await run_cached(request.prompt, run_blender_pipeline)
         
         # 3. Return Result
         return {
@@ -70,11 +96,65 @@ async def chat_endpoint(request: ChatRequest):
         }
 
     except Exception as e:
-        logger.error(f"Agent Pipeline Failed: {e}")
+        logger.error("Agent Pipeline Failed: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
+async def _ndjson(events):
+    """Encode pipeline events as newline-delimited JSON (async, so Starlette never offloads to a threadpool)."""
+    async for event in events:
+        yield orjson.dumps(event, option=orjson.OPT_APPEND_NEWLINE)
+
+@app.post("/chat/stream")
+async def chat_stream_endpoint(request: ChatRequest):
+    """
+    Streaming variant of /chat: emits agent text as it is produced,
+    then one final {"type": "result", ...} line.
+    """
+    logger.info("Received Streaming Request: %s", request.prompt)
+
+    if not os.environ.get("GEMINI_API_KEY"):
+        logger.error("GEMINI_API_KEY is missing!")
+        raise HTTPException(
+            status_code=500, 
+            detail="Server Error: GEMINI_API_KEY not found in environment."
+        )
+
+    return StreamingResponse(
+        _ndjson(stream_blender_pipeline(request.prompt)),
+        media_type="application/x-ndjson"
+    )
+
+# Each worker keeps persistent Blender connections open: one from its MCP
+# subprocess, one in-process (probes, execute_script, response cache).
+BLENDER_CONNECTIONS_PER_WORKER = 2
+# Must match MAX_CLIENTS in addon/socket_listener.py; Blender refuses connections beyond it.
+BLENDER_MAX_CLIENTS = int(os.getenv("BLENDER_MAX_CLIENTS", "8"))
+
+def _worker_count() -> int:
+    """WEB_CONCURRENCY, capped so every worker's Blender connections fit under BLENDER_MAX_CLIENTS."""
+    requested = int(os.getenv("WEB_CONCURRENCY", "2"))
+    limit = max(1, BLENDER_MAX_CLIENTS // BLENDER_CONNECTIONS_PER_WORKER)
+    if requested > limit:
+        logger.warning(
+            "WEB_CONCURRENCY=%s needs %s Blender connections but Blender accepts %s; using %s workers.",
+            requested, requested * BLENDER_CONNECTIONS_PER_WORKER, BLENDER_MAX_CLIENTS, limit
+        )
+        return limit
+    return max(1, requested)
+
 if __name__ == "__main__":
     # Run the server
     print("--- Starting Blender AI Agent Service (ADK Powered) ---")
     print("Listening on http://127.0.0.1:8000")
-    uvicorn.run(app, host="127.0.0.1", port=8000)
+    # Multiple workers need the app as an import string. Each worker is its own
+    # process (own MCP subprocess, sessions, and response cache); sessions are
+    # created per request, so no affinity is needed.
+    # "auto" picks uvloop/httptools when installed (uvloop is not available on Windows).
+    uvicorn.run(
+        "agent_service.src.main:app",
+        host="127.0.0.1",
+        port=8000,
+        workers=_worker_count(),
+        loop="auto",
+        http="auto",
+    )
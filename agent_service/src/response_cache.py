@@ -0,0 +1,129 @@
+# agent_service/src/response_cache.py
+
+import os
+import time
+import json
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional
+
+from ..blender_client import send_to_blender
+
+logger = logging.getLogger(__name__)
+
+# --- CONFIG ---
+CACHE_MAX_ENTRIES = 128
+CACHE_TTL_S = 3600.0
+
+
+def cache_enabled() -> bool:
+    """Opt-in via BLENDER_AGENT_CACHE=1 (read per call so .env loading order doesn't matter)."""
+    return os.environ.get("BLENDER_AGENT_CACHE") == "1"
+
+
+class ResponseCache:
+    """
+    Small in-process LRU cache with a TTL per entry.
+    Keys already include the scene-context hash, so a changed scene simply misses.
+    """
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, ttl_s: float = CACHE_TTL_S):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._entries: "OrderedDict[str, tuple[float, dict]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[dict]:
+        item = self._entries.get(key)
+        if item is None:
+            return None
+        stored_at, value = item
+        if time.monotonic() - stored_at > self.ttl_s:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: str, value: dict) -> None:
+        self._entries[key] = (time.monotonic(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def discard(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+response_cache = ResponseCache()
+
+
+def _normalize_prompt(prompt: str) -> str:
+    return " ".join(prompt.lower().split())
+
+
+def _cache_key(prompt: str, scene_hash: str) -> str:
+    raw = f"{_normalize_prompt(prompt)}\0{scene_hash}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+async def _scene_hash() -> Optional[str]:
+    """
+    Hash the live Blender context plus the active node tree (the script's actual
+    target); None if Blender can't be reached or nothing is selected.
+    """
+    ctx = await asyncio.to_thread(send_to_blender, "get_current_context")
+    if not ctx.get("ok"):
+        return None
+    # No Geometry Nodes tree yet is a valid starting state, hashed as None
+    tree = await asyncio.to_thread(send_to_blender, "get_node_tree_json")
+    snapshot = json.dumps(
+        [ctx.get("data"), tree.get("data") if tree.get("ok") else None],
+        sort_keys=True, default=str
+    )
+    return hashlib.sha256(snapshot.encode("utf-8")).hexdigest()
+
+
+async def run_cached(prompt: str, pipeline: Callable[[str], Awaitable[dict]]) -> dict:
+    """
+    Serve a previous SUCCESS response for the same prompt in the same scene state.
+    A hit still replays the cached script in Blender, since the pipeline's real
+    output is the scene mutation. Only runs whose script was their sole mutation
+    are stored, so the script alone reproduces them from the hashed state.
+    A failed replay falls back to the pipeline only if it left the scene untouched.
+    """
+    if not cache_enabled():
+        return await pipeline(prompt)
+
+    scene_hash = await _scene_hash()
+    if scene_hash is None:
+        return await pipeline(prompt)
+
+    key = _cache_key(prompt, scene_hash)
+    cached = response_cache.get(key)
+    if cached is not None:
+        replay = await asyncio.to_thread(
+            send_to_blender, "execute_script", {"script_content": cached["code"]}
+        )
+        if replay.get("ok"):
+            logger.info("Response cache hit; replayed cached script.")
+            return cached
+
+        response_cache.discard(key)
+        if await _scene_hash() != scene_hash:
+            # A partial replay changed the scene; planning on top of it would build on a half-applied script
+            logger.warning("Cached script replay failed after changing the scene.")
+            return {
+                "text": f"Cached script failed partway and may have left partial changes: {replay.get('error')}",
+                "code": None,
+                "status": "ERROR"
+            }
+        logger.info("Cached script replay failed; running pipeline.")
+
+    result = await pipeline(prompt)
+    if result.get("status") == "SUCCESS" and result.get("code") and result.get("replayable"):
+        response_cache.put(key, result)
+    return result